@@ -9,7 +9,7 @@ import os
 import time
 from collections import deque
 from contextlib import asynccontextmanager
-from datetime import datetime
+from datetime import datetime, timezone
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
 log = logging.getLogger("strategy")
@@ -31,7 +31,7 @@ from strategy_core import (
     get_current_slot_ts,
     SLOT_STEP,
 )
-from simulator import Portfolio
+from simulator import Portfolio, PNL_HISTORY_SIZE, TRADE_LOG_SIZE
 import db as database
 
 # ── Config ────────────────────────────────────────────────────────────────────
@@ -76,7 +76,10 @@ async def broadcast(data: dict):
 
 async def strategy_loop():
     # Restaurar portafolio desde DB
-    saved     = database.load_state()
+    saved     = database.load_state_summary(
+        recent  = TRADE_LOG_SIZE,
+        history = PNL_HISTORY_SIZE,
+    )
     portfolio = Portfolio(
         initial_capital = saved["initial_capital"],
         db              = database,
@@ -84,7 +87,7 @@ async def strategy_loop():
     portfolio.restore(saved)
     log.info(
         f"Portafolio restaurado: capital=${portfolio.capital:.2f}, "
-        f"trades históricos={len(portfolio.closed_trades)}"
+        f"trades históricos={saved['aggregates']['total']}"
     )
 
     obi_window  = deque(maxlen=WINDOW_SIZE)
@@ -155,6 +158,7 @@ async def strategy_loop():
             signal = compute_signal(ob["obi"], list(obi_window), OBI_THRESHOLD)
 
             # ── Simulation ────────────────────────────────────────────────────
+            now       = datetime.now(timezone.utc)   # un solo reloj por tick
             secs_left = seconds_remaining(market_info)
 
             # Try entering a trade
@@ -164,6 +168,7 @@ async def strategy_loop():
                     market_info["question"],
                     market_info["up_price"],
                     market_info["down_price"],
+                    now,
                 )
 
             # Close trade when market is about to end
@@ -196,7 +201,7 @@ async def strategy_loop():
             state["status"]    = "running"
             state["error"]     = None
             state["snapshot"]  = snap
-            state["timestamp"] = datetime.utcnow().isoformat() + "Z"
+            state["timestamp"] = now.replace(tzinfo=None).isoformat() + "Z"
             state["market"]    = {
                 **market_info,
                 "seconds_remaining": round(secs_left, 1) if secs_left is not None else None,
@@ -231,6 +236,8 @@ async def lifespan(app: FastAPI):
         await task
     except asyncio.CancelledError:
         pass
+    # Esperar a que el hilo escritor vacíe la cola antes de salir
+    await asyncio.to_thread(database.flush)
 
 
 app       = FastAPI(title="Polymarket SOL Strategy", lifespan=lifespan)
@@ -250,6 +257,7 @@ async def health():
         "market":    state.get("market", {}).get("question"),
         "snapshot":  state.get("snapshot"),
         "error":     state.get("error"),
+        "db_write_failures": database.write_failures(),
     }
 
 
@@ -8,9 +8,11 @@ Storage path:
 Se controla con la variable de entorno DATA_DIR.
 """
 
+import functools
 import json
 import logging
 import os
+import queue
 import sqlite3
 import threading
 
@@ -41,48 +43,82 @@ def _resolve_data_dir() -> str:
 DATA_DIR = _resolve_data_dir()
 DB_PATH  = os.path.join(DATA_DIR, "portfolio.db")
 
-_lock = threading.Lock()
-_conn: sqlite3.Connection | None = None
-
-
-def _get_conn() -> sqlite3.Connection:
-    global _conn
-    if _conn is None:
-        _conn = sqlite3.connect(DB_PATH, check_same_thread=False)
-        _conn.execute("PRAGMA journal_mode=WAL")   # mejor concurrencia
-        _conn.execute("PRAGMA synchronous=NORMAL") # buen balance durabilidad/velocidad
-        _conn.row_factory = sqlite3.Row
+# Una sola conexión de escritura (serializada con _write_lock) y una
+# conexión de lectura por hilo: con WAL los lectores no bloquean al
+# escritor ni entre sí.
+_write_lock = threading.Lock()
+_writer_conn: sqlite3.Connection | None = None
+_reader_local = threading.local()
+
+
+def _connect() -> sqlite3.Connection:
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False,
+                           cached_statements=256)
+    conn.execute("PRAGMA journal_mode=WAL")   # mejor concurrencia
+    conn.execute("PRAGMA synchronous=NORMAL") # buen balance durabilidad/velocidad
+    conn.execute("PRAGMA mmap_size=268435456")   # lecturas vía mmap, sin read()
+    conn.execute("PRAGMA cache_size=-65536")     # 64 MB de page cache
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA wal_autocheckpoint=1000")
+    conn.execute("PRAGMA busy_timeout=5000")     # esperar locks en vez de fallar
+    return conn
+
+
+def _writer() -> sqlite3.Connection:
+    global _writer_conn
+    if _writer_conn is None:
+        _writer_conn = _connect()
         log.info(f"DB conectada: {DB_PATH}")
-    return _conn
+    return _writer_conn
+
+
+def _reader() -> sqlite3.Connection:
+    conn = getattr(_reader_local, "conn", None)
+    if conn is None:
+        conn = _connect()
+        conn.execute("PRAGMA query_only=1")
+        _reader_local.conn = conn
+    return conn
+
+
+# entry_time / created_at en segundos unix (UTC)
+_TRADES_DDL = """
+    CREATE TABLE IF NOT EXISTS trades (
+        id          INTEGER PRIMARY KEY,
+        market      TEXT    NOT NULL,
+        direction   TEXT    NOT NULL,
+        entry_price REAL    NOT NULL,
+        shares      REAL    NOT NULL,
+        bet_size    REAL    NOT NULL,
+        entry_time  INTEGER NOT NULL,
+        exit_price  REAL,
+        pnl         REAL,
+        status      TEXT    NOT NULL DEFAULT 'OPEN',
+        created_at  INTEGER DEFAULT (CAST(strftime('%s', 'now') AS INTEGER))
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_trades_status ON trades(status);
+"""
 
 
 def init_db() -> None:
     """Crea las tablas si no existen. Llamar al inicio del servidor."""
-    conn = _get_conn()
-    conn.executescript("""
-        CREATE TABLE IF NOT EXISTS trades (
-            id          INTEGER PRIMARY KEY,
-            market      TEXT    NOT NULL,
-            direction   TEXT    NOT NULL,
-            entry_price REAL    NOT NULL,
-            shares      REAL    NOT NULL,
-            bet_size    REAL    NOT NULL,
-            entry_time  TEXT    NOT NULL,
-            exit_price  REAL,
-            pnl         REAL,
-            status      TEXT    NOT NULL DEFAULT 'OPEN',
-            created_at  TEXT    DEFAULT (datetime('now'))
-        );
+    conn = _writer()
+    conn.executescript(_TRADES_DDL + """
 
         CREATE TABLE IF NOT EXISTS portfolio_state (
             id              INTEGER PRIMARY KEY CHECK (id = 1),
             capital         REAL    NOT NULL,
             initial_capital REAL    NOT NULL,
-            pnl_history     TEXT    NOT NULL DEFAULT '[0.0]',
             trade_counter   INTEGER NOT NULL DEFAULT 0,
             updated_at      TEXT    DEFAULT (datetime('now'))
         );
 
+        CREATE TABLE IF NOT EXISTS pnl_history (
+            id  INTEGER PRIMARY KEY AUTOINCREMENT,
+            pnl REAL    NOT NULL
+        );
+
         CREATE TABLE IF NOT EXISTS sessions (
             id         INTEGER PRIMARY KEY AUTOINCREMENT,
             started_at TEXT DEFAULT (datetime('now')),
@@ -91,73 +127,250 @@ def init_db() -> None:
     """)
     conn.commit()
 
+    _migrate_trade_times(conn)
+    _migrate_pnl_history(conn)
+
     # Registrar sesión de inicio
     conn.execute("INSERT INTO sessions (note) VALUES ('server start')")
     conn.commit()
+    _start_writer_thread()
     log.info("DB inicializada correctamente")
 
 
+def _migrate_trade_times(conn: sqlite3.Connection) -> None:
+    """
+    Bases antiguas guardaban entry_time como TEXT "HH:MM:SS" (sin fecha)
+    y created_at como TEXT. Reconstruye la tabla trades con columnas
+    INTEGER; la fecha de entry_time se toma de created_at. Como los
+    cierres usan INSERT OR REPLACE, en trades cerrados created_at es la
+    hora de cierre: si la entrada resultante queda despues de created_at,
+    el trade se abrio el dia anterior y se resta un dia.
+    """
+    cols = {r[1]: r[2] for r in conn.execute("PRAGMA table_info(trades)")}
+    if cols.get("entry_time", "").upper() != "TEXT":
+        return
+
+    conn.executescript("""
+        DROP INDEX IF EXISTS idx_trades_status;
+        ALTER TABLE trades RENAME TO trades_old;
+    """ + _TRADES_DDL + """
+        INSERT INTO trades
+            (id, market, direction, entry_price, shares, bet_size,
+             entry_time, exit_price, pnl, status, created_at)
+        SELECT id, market, direction, entry_price, shares, bet_size,
+               CASE WHEN entry_ts > created_ts THEN entry_ts - 86400
+                    ELSE COALESCE(entry_ts, created_ts, 0) END,
+               exit_price, pnl, status, created_ts
+        FROM (
+            SELECT *,
+                   CAST(strftime('%s', date(created_at) || ' ' || entry_time) AS INTEGER) AS entry_ts,
+                   CAST(strftime('%s', created_at) AS INTEGER) AS created_ts
+            FROM trades_old
+        );
+
+        DROP TABLE trades_old;
+    """)
+    conn.commit()
+    log.info("Tabla trades migrada a timestamps INTEGER")
+
+
+def _migrate_pnl_history(conn: sqlite3.Connection) -> None:
+    """
+    Bases antiguas guardaban pnl_history como JSON en portfolio_state.
+    Si la tabla pnl_history está vacía, la llena desde esa columna
+    (o con el punto inicial 0.0 si no hay historial previo).
+    """
+    if conn.execute("SELECT 1 FROM pnl_history LIMIT 1").fetchone():
+        return
+
+    history = [0.0]
+    cols = {r[1] for r in conn.execute("PRAGMA table_info(portfolio_state)")}
+    if "pnl_history" in cols:
+        row = conn.execute("SELECT pnl_history FROM portfolio_state WHERE id = 1").fetchone()
+        if row and row[0]:
+            history = json.loads(row[0])
+            log.info(f"pnl_history migrado a tabla propia: {len(history)} puntos")
+
+    conn.executemany(_SQL_INSERT_PNL, [(p,) for p in history])
+    conn.commit()
+
+
 # ── Escritura ─────────────────────────────────────────────────────────────────
 
+_SQL_INSERT_TRADE = """
+    INSERT OR REPLACE INTO trades
+        (id, market, direction, entry_price, shares, bet_size,
+         entry_time, exit_price, pnl, status)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+_SQL_UPSERT_PORTFOLIO = """
+    INSERT OR REPLACE INTO portfolio_state
+        (id, capital, initial_capital, trade_counter, updated_at)
+    VALUES (1, ?, ?, ?, datetime('now'))
+"""
+
+_SQL_INSERT_PNL = "INSERT INTO pnl_history (pnl) VALUES (?)"
+
+
+def _trade_params(trade) -> tuple:
+    return (
+        trade.id, trade.market, trade.direction,
+        trade.entry_price, trade.shares, trade.bet_size,
+        trade.entry_time, trade.exit_price, trade.pnl, trade.status,
+    )
+
+
 def save_trade(trade) -> None:
     """
     Inserta o actualiza un trade en la DB.
     Llamar al abrir (status=OPEN) y al cerrar (status=WIN/LOSS/CANCELLED).
     """
-    with _lock:
-        _get_conn().execute(
-            """
-            INSERT OR REPLACE INTO trades
-                (id, market, direction, entry_price, shares, bet_size,
-                 entry_time, exit_price, pnl, status)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-            (
-                trade.id, trade.market, trade.direction,
-                trade.entry_price, trade.shares, trade.bet_size,
-                trade.entry_time, trade.exit_price, trade.pnl, trade.status,
-            ),
-        )
-        _get_conn().commit()
+    with _write_lock:
+        conn = _writer()
+        with conn:   # commit, o rollback si falla
+            conn.execute(_SQL_INSERT_TRADE, _trade_params(trade))
+
+
+# ── Escritura asíncrona ───────────────────────────────────────────────────────
+# Estado del portafolio y cierres se encolan y los escribe un hilo dedicado,
+# así el loop de la estrategia no espera el fsync. Los trades abiertos
+# (save_trade) siguen siendo síncronos. flush() espera a vaciar la cola y
+# relanza el primer error de escritura ocurrido desde el flush anterior.
+
+_writer_q: queue.Queue = queue.Queue()
+_writer_thread: threading.Thread | None = None
+_write_failures = 0
+_pending_error: Exception | None = None
+
+
+def _writer_loop() -> None:
+    global _write_failures, _pending_error
+    while True:
+        op = _writer_q.get()
+        try:
+            op()
+        except Exception as exc:
+            log.exception("Error en escritura asíncrona a la DB")
+            _write_failures += 1
+            if _pending_error is None:
+                _pending_error = exc
+        finally:
+            _writer_q.task_done()
+
+
+def _start_writer_thread() -> None:
+    global _writer_thread
+    with _write_lock:
+        if _writer_thread is None:
+            _writer_thread = threading.Thread(
+                target=_writer_loop, name="db-writer", daemon=True,
+            )
+            _writer_thread.start()
+
+
+def _enqueue(fn, *args) -> None:
+    if _writer_thread is None:
+        _start_writer_thread()
+    _writer_q.put(functools.partial(fn, *args))
+
+
+def flush() -> None:
+    """
+    Bloquea hasta que todas las escrituras encoladas estén en disco.
+    Si alguna falló desde el último flush, relanza el primer error.
+    """
+    global _pending_error
+    _writer_q.join()
+    exc, _pending_error = _pending_error, None
+    if exc is not None:
+        raise exc
+
+
+def write_failures() -> int:
+    """Total de escrituras asíncronas fallidas desde el arranque."""
+    return _write_failures
+
+
+def _write_close(trade_row: tuple | None, portfolio_row: tuple | None,
+                 pnl: float | None) -> None:
+    with _write_lock:
+        conn = _writer()
+        # Una sola transacción: commit al final o rollback completo si algún
+        # INSERT falla, para no dejarla abierta en la conexión compartida
+        with conn:
+            if trade_row is not None:
+                conn.execute(_SQL_INSERT_TRADE, trade_row)
+            if portfolio_row is not None:
+                conn.execute(_SQL_UPSERT_PORTFOLIO, portfolio_row)
+            if pnl is not None:
+                conn.execute(_SQL_INSERT_PNL, (pnl,))
 
 
 def save_portfolio_state(capital: float, initial_capital: float,
-                         pnl_history: list, trade_counter: int) -> None:
-    """Guarda el estado del portafolio (upsert en fila única id=1)."""
-    with _lock:
-        _get_conn().execute(
-            """
-            INSERT OR REPLACE INTO portfolio_state
-                (id, capital, initial_capital, pnl_history, trade_counter, updated_at)
-            VALUES (1, ?, ?, ?, ?, datetime('now'))
-            """,
-            (capital, initial_capital, json.dumps(pnl_history), trade_counter),
-        )
-        _get_conn().commit()
+                         trade_counter: int) -> None:
+    """Encola el estado del portafolio (upsert en fila única id=1)."""
+    _enqueue(_write_close, None, (capital, initial_capital, trade_counter), None)
 
 
-# ── Lectura ───────────────────────────────────────────────────────────────────
+def append_pnl(pnl: float) -> None:
+    """Encola un punto nuevo del historial de P&L acumulado."""
+    _enqueue(_write_close, None, None, pnl)
 
-def load_state() -> dict:
+
+def save_close(trade, capital: float, initial_capital: float,
+               trade_counter: int, pnl: float | None = None) -> None:
     """
-    Carga el estado guardado al arrancar.
-    Retorna un dict con capital, pnl_history, trade_counter y closed_trades.
-    Si no hay datos previos, retorna valores por defecto.
+    Encola el trade cerrado/cancelado, el estado del portafolio y, si se
+    pasa `pnl`, el nuevo punto de pnl_history. Se escriben en una sola
+    transacción (un único commit). Los valores se capturan al encolar.
     """
-    from simulator import Trade   # import local para evitar circular
+    _enqueue(_write_close, _trade_params(trade),
+             (capital, initial_capital, trade_counter), pnl)
 
-    conn = _get_conn()
 
-    # Estado del portafolio
-    row = conn.execute(
-        "SELECT * FROM portfolio_state WHERE id = 1"
-    ).fetchone()
+# ── Lectura ───────────────────────────────────────────────────────────────────
+
+_SQL_SELECT_PORTFOLIO     = ("SELECT capital, initial_capital, trade_counter "
+                             "FROM portfolio_state WHERE id = 1")
+# Columnas en el mismo orden que los campos de Trade → Trade(*row)
+_TRADE_COLS = ("id, market, direction, entry_price, shares, bet_size, "
+               "entry_time, exit_price, pnl, status")
+_SQL_SELECT_CLOSED_TRADES = f"SELECT {_TRADE_COLS} FROM trades WHERE status != 'OPEN' ORDER BY id"
+_SQL_SELECT_RECENT_TRADES = f"SELECT {_TRADE_COLS} FROM trades WHERE status != 'OPEN' ORDER BY id DESC LIMIT ?"
+_SQL_SELECT_PNL_HISTORY   = "SELECT pnl FROM pnl_history ORDER BY id"
+_SQL_SELECT_PNL_TAIL      = """
+    SELECT pnl FROM (SELECT id, pnl FROM pnl_history ORDER BY id DESC LIMIT ?)
+    ORDER BY id
+"""
+_SQL_SELECT_TRADE_AGGS    = """
+    SELECT COUNT(*),
+           TOTAL(status = 'WIN'),
+           TOTAL(status = 'LOSS'),
+           TOTAL(status = 'CANCELLED'),
+           TOTAL(pnl),
+           MAX(NULLIF(pnl, 0)),
+           MIN(NULLIF(pnl, 0))
+    FROM trades WHERE status != 'OPEN'
+"""
+
+
+def _load_portfolio(conn: sqlite3.Connection, history: int | None = None) -> dict:
+    """
+    Fila de portfolio_state + pnl_history, con valores por defecto.
+    Con `history`, solo trae los últimos `history` puntos del P&L.
+    """
+    row = conn.execute(_SQL_SELECT_PORTFOLIO).fetchone()
+
+    # Historial de P&L acumulado (una fila por cierre)
+    if history is None:
+        cur = conn.execute(_SQL_SELECT_PNL_HISTORY)
+    else:
+        cur = conn.execute(_SQL_SELECT_PNL_TAIL, (history,))
+    pnl_history = [r[0] for r in cur] or [0.0]
 
     if row:
-        capital         = row["capital"]
-        initial_capital = row["initial_capital"]
-        pnl_history     = json.loads(row["pnl_history"])
-        trade_counter   = row["trade_counter"]
+        capital, initial_capital, trade_counter = row
         log.info(
             f"Estado cargado: capital=${capital:.2f}, "
             f"trades={trade_counter}, "
@@ -166,42 +379,74 @@ def load_state() -> dict:
     else:
         capital         = 100.0
         initial_capital = 100.0
-        pnl_history     = [0.0]
         trade_counter   = 0
         log.info("Sin estado previo — iniciando desde cero ($100)")
 
-    # Trades cerrados (historial completo)
-    rows = conn.execute(
-        "SELECT * FROM trades WHERE status != 'OPEN' ORDER BY id"
-    ).fetchall()
-
-    closed_trades = []
-    for r in rows:
-        t = Trade(
-            id          = r["id"],
-            market      = r["market"],
-            direction   = r["direction"],
-            entry_price = r["entry_price"],
-            shares      = r["shares"],
-            bet_size    = r["bet_size"],
-            entry_time  = r["entry_time"],
-            exit_price  = r["exit_price"],
-            pnl         = r["pnl"],
-            status      = r["status"],
-        )
-        closed_trades.append(t)
-
-    if closed_trades:
-        log.info(f"Trades históricos cargados: {len(closed_trades)}")
-
     return {
         "capital":         capital,
         "initial_capital": initial_capital,
         "pnl_history":     pnl_history,
         "trade_counter":   trade_counter,
-        "closed_trades":   closed_trades,
     }
 
 
+def _fetch_trades(conn: sqlite3.Connection, sql: str, params=()) -> list:
+    """Ejecuta una consulta sobre _TRADE_COLS y construye los Trade por posición."""
+    from simulator import Trade   # import local para evitar circular
+
+    return [Trade(*r) for r in conn.execute(sql, params).fetchall()]
+
+
+def load_state() -> dict:
+    """
+    Carga el estado guardado con el historial completo de trades.
+    Retorna un dict con capital, pnl_history, trade_counter y closed_trades.
+    Si no hay datos previos, retorna valores por defecto.
+    """
+    conn  = _reader()
+    state = _load_portfolio(conn)
+
+    # Trades cerrados (historial completo)
+    closed_trades = _fetch_trades(conn, _SQL_SELECT_CLOSED_TRADES)
+
+    if closed_trades:
+        log.info(f"Trades históricos cargados: {len(closed_trades)}")
+
+    state["closed_trades"] = closed_trades
+    return state
+
+
+def load_state_summary(recent: int = 20, history: int = 1024) -> dict:
+    """
+    Carga el estado al arrancar sin hidratar todo el historial.
+    Igual que load_state, pero closed_trades trae solo los últimos
+    `recent` trades, pnl_history solo los últimos `history` puntos y
+    "aggregates" trae los contadores calculados en SQL
+    (total, wins, losses, cancelled, realized_pnl, best_pnl, worst_pnl).
+    """
+    conn  = _reader()
+    state = _load_portfolio(conn, history)
+
+    total, wins, losses, cancelled, realized, best, worst = (
+        conn.execute(_SQL_SELECT_TRADE_AGGS).fetchone()
+    )
+    recent_trades = _fetch_trades(conn, _SQL_SELECT_RECENT_TRADES, (recent,))
+    recent_trades.reverse()
+
+    state["closed_trades"] = recent_trades
+    state["aggregates"] = {
+        "total":        total,
+        "wins":         int(wins),
+        "losses":       int(losses),
+        "cancelled":    int(cancelled),
+        "realized_pnl": realized,
+        "best_pnl":     best,
+        "worst_pnl":    worst,
+    }
+    if total:
+        log.info(f"Trades históricos: {total} (cargados los últimos {len(recent_trades)})")
+    return state
+
+
 def db_path() -> str:
     return DB_PATH
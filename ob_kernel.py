@@ -0,0 +1,29 @@
+"""
+ob_kernel.py — Kernel numerico del order book (totales por lado).
+
+Modulo aparte y con tipos estrictos para poder compilarlo ahead-of-time
+con mypyc, sin coste de JIT al arrancar:
+
+    pip install mypy
+    mypyc ob_kernel.py      # genera ob_kernel.*.so junto al .py
+
+Python importa la extension compilada antes que el .py, asi que
+strategy.py no cambia; sin compilar se usa esta misma version pura.
+"""
+
+
+def side_totals(levels: list[tuple[float, float]]) -> tuple[float, float]:
+    """
+    Una sola pasada sobre los niveles (precio, size) de un lado del book.
+    Retorna (volumen, sum(precio * size)).
+    Con los pocos niveles que se analizan por lado (TOP_LEVELS en
+    strategy.py) el bucle fusionado fue mas rapido que las variantes con
+    sum(map(...)), itertools.starmap o math.fsum (medido con la stdlib;
+    numpy no se midio porque no es dependencia).
+    """
+    volume:   float = 0.0
+    notional: float = 0.0
+    for price, size in levels:
+        volume   += size
+        notional += price * size
+    return volume, notional
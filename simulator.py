@@ -2,8 +2,11 @@
 simulator.py — Portfolio simulation: $100 capital, 2% per trade
 """
 
-from dataclasses import dataclass, field
+import time
+from collections import deque
+from dataclasses import dataclass
 from datetime import datetime
+from itertools import islice
 from typing import Optional
 
 
@@ -11,9 +14,14 @@ INITIAL_CAPITAL = 100.0
 TRADE_PCT       = 0.02      # 2% of current capital per trade
 MIN_CONFIDENCE  = 65        # minimum confidence to enter a trade
 ENTRY_AFTER_N   = 4         # consistent snapshots required before entering
+TRADE_LOG_SIZE  = 20        # closed trades shown in stats()["trade_log"]
+PNL_HISTORY_SIZE = 1024     # cumulative P&L points kept in memory
 
+# Directional signal labels normalized to UP/DOWN
+_LABEL_DIR = {"UP": "UP", "DOWN": "DOWN", "STRONG UP": "UP", "STRONG DOWN": "DOWN"}
 
-@dataclass
+
+@dataclass(slots=True)
 class Trade:
     id:           int
     market:       str
@@ -21,7 +29,7 @@ class Trade:
     entry_price:  float        # token price at entry (0-1)
     shares:       float        # usdc_bet / entry_price
     bet_size:     float        # USDC committed
-    entry_time:   str
+    entry_time:   int          # unix seconds (UTC)
     # filled at close
     exit_price:   Optional[float] = None
     pnl:          Optional[float] = None
@@ -32,7 +40,7 @@ class Trade:
         return round(self.shares * current_price, 4)
 
     def unrealized_pnl(self, current_price: float) -> float:
-        return round(self.mark_to_market(current_price) - self.bet_size, 4)
+        return round(self.shares * current_price - self.bet_size, 4)
 
     def close(self, won: bool, exit_price: float) -> float:
         """
@@ -43,11 +51,10 @@ class Trade:
         """
         self.exit_price = exit_price
         if won:
-            proceeds   = self.shares * 1.0
-            self.pnl   = round(proceeds - self.bet_size, 4)
+            self.pnl    = round(self.shares - self.bet_size, 4)
             self.status = "WIN"
         else:
-            self.pnl   = round(-self.bet_size, 4)
+            self.pnl    = -self.bet_size   # bet_size ya viene redondeado a 2 decimales
             self.status = "LOSS"
         return self.pnl
 
@@ -59,7 +66,7 @@ class Trade:
             "entry_price":  self.entry_price,
             "shares":       round(self.shares, 4),
             "bet_size":     self.bet_size,
-            "entry_time":   self.entry_time,
+            "entry_time":   time.strftime("%H:%M:%S", time.gmtime(self.entry_time)),
             "exit_price":   self.exit_price,
             "pnl":          self.pnl,
             "status":       self.status,
@@ -67,33 +74,119 @@ class Trade:
 
 
 class Portfolio:
+    __slots__ = (
+        "initial_capital", "capital", "trade_pct", "active_trade",
+        "pnl_history", "_trade_counter", "_db",
+        "_streak_label", "_streak_count", "_stats_cache",
+        "_n_total", "_n_wins", "_n_losses", "_n_cancelled",
+        "_realized_pnl_sum", "_best_pnl", "_worst_pnl", "_recent_log",
+    )
+
     def __init__(self, initial_capital: float = INITIAL_CAPITAL, trade_pct: float = TRADE_PCT,
                  db=None):
         self.initial_capital  = initial_capital
         self.capital          = initial_capital
         self.trade_pct        = trade_pct
         self.active_trade: Optional[Trade] = None
-        self.closed_trades: list[Trade] = []
-        self.pnl_history: list[float]   = [0.0]
+        self.pnl_history: deque[float]  = deque([0.0], maxlen=PNL_HISTORY_SIZE)
         self._trade_counter = 0
         self._db = db  # módulo db para persistencia (opcional)
         # For entry confirmation
-        self._signal_streak: dict = {"label": None, "count": 0}
+        self._streak_label: Optional[str] = None
+        self._streak_count = 0
+        # Agregados de los trades cerrados; None = hay que recalcular
+        self._stats_cache: Optional[dict] = None
+        self._reset_aggregates()
+        # Últimos trades cerrados ya serializados (más reciente primero)
+        self._recent_log: deque[dict] = deque(maxlen=TRADE_LOG_SIZE)
+
+    def _reset_aggregates(self) -> None:
+        self._n_total          = 0
+        self._n_wins           = 0
+        self._n_losses         = 0
+        self._n_cancelled      = 0
+        self._realized_pnl_sum = 0.0
+        self._best_pnl: Optional[float]  = None
+        self._worst_pnl: Optional[float] = None
+
+    def _record_closed(self, trades) -> None:
+        """
+        Suma a los contadores de trades cerrados los trades dados, en una
+        sola pasada con variables locales (restore pasa todo el historial,
+        un cierre pasa un solo trade).
+        """
+        n_total, wins, losses, cancelled = 0, self._n_wins, self._n_losses, self._n_cancelled
+        realized, best, worst = self._realized_pnl_sum, self._best_pnl, self._worst_pnl
+
+        for t in trades:
+            n_total += 1
+            status = t.status
+            if status == "WIN":
+                wins += 1
+            elif status == "LOSS":
+                losses += 1
+            elif status == "CANCELLED":
+                cancelled += 1
+
+            pnl = t.pnl
+            if pnl is not None:
+                realized += pnl
+            if pnl:
+                if best is None or pnl > best:
+                    best = pnl
+                if worst is None or pnl < worst:
+                    worst = pnl
+
+        self._n_total         += n_total
+        self._n_wins           = wins
+        self._n_losses         = losses
+        self._n_cancelled      = cancelled
+        self._realized_pnl_sum = realized
+        self._best_pnl         = best
+        self._worst_pnl        = worst
+        self._stats_cache      = None
+
+    def _append_closed(self, trade: Trade) -> None:
+        self._record_closed((trade,))
+        self._recent_log.appendleft(trade.to_dict())
 
     def restore(self, saved: dict) -> None:
-        """Restaura el estado desde la DB al arrancar el servidor."""
+        """
+        Restaura el estado desde la DB al arrancar el servidor.
+        Acepta load_state() o load_state_summary(); con el resumen,
+        saved["closed_trades"] solo contiene los últimos trades y los
+        contadores salen de saved["aggregates"]. Los trades no se retienen:
+        solo alimentan los contadores y _recent_log.
+        """
         self.capital         = saved["capital"]
         self.initial_capital = saved["initial_capital"]
-        self.pnl_history     = saved["pnl_history"]
+        self.pnl_history     = deque(saved["pnl_history"], maxlen=PNL_HISTORY_SIZE)
         self._trade_counter  = saved["trade_counter"]
-        self.closed_trades   = saved["closed_trades"]
+        self._reset_aggregates()
+        aggs = saved.get("aggregates")
+        if aggs is not None:
+            self._n_total          = aggs["total"]
+            self._n_wins           = aggs["wins"]
+            self._n_losses         = aggs["losses"]
+            self._n_cancelled      = aggs["cancelled"]
+            self._realized_pnl_sum = aggs["realized_pnl"]
+            self._best_pnl         = aggs["best_pnl"]
+            self._worst_pnl        = aggs["worst_pnl"]
+        else:
+            self._record_closed(saved["closed_trades"])
+        self._recent_log.clear()
+        self._recent_log.extendleft(t.to_dict() for t in saved["closed_trades"][-TRADE_LOG_SIZE:])
+        self._stats_cache    = None
 
     # ── Entry logic ────────────────────────────────────────────────────────────
 
-    def consider_entry(self, signal: dict, market_question: str, up_price: float, down_price: float) -> bool:
+    def consider_entry(self, signal: dict, market_question: str, up_price: float, down_price: float,
+                       now: Optional[datetime] = None) -> bool:
         """
         Track signal streak. Enter trade when signal is consistent
         for ENTRY_AFTER_N snapshots and confidence >= MIN_CONFIDENCE.
+        `now` is the tick's UTC timestamp, so the caller reads the clock
+        once per tick; it becomes the trade's entry_time if one is entered.
         Returns True if a trade was entered.
         """
         if self.active_trade is not None:
@@ -104,21 +197,21 @@ class Portfolio:
         label = signal["label"]
         conf  = signal["confidence"]
 
-        # Only act on directional signals
-        if label not in ("UP", "DOWN", "STRONG UP", "STRONG DOWN"):
-            self._signal_streak = {"label": None, "count": 0}
+        # Only act on directional signals, normalized to UP/DOWN
+        direction = _LABEL_DIR.get(label)
+        if direction is None:
+            self._streak_label = None
+            self._streak_count = 0
             return False
 
-        # Normalize to UP/DOWN
-        direction = "UP" if "UP" in label else "DOWN"
-
         # Track streak
-        if self._signal_streak["label"] == direction:
-            self._signal_streak["count"] += 1
+        if self._streak_label == direction:
+            self._streak_count += 1
         else:
-            self._signal_streak = {"label": direction, "count": 1}
+            self._streak_label = direction
+            self._streak_count = 1
 
-        if self._signal_streak["count"] < ENTRY_AFTER_N:
+        if self._streak_count < ENTRY_AFTER_N:
             return False
         if conf < MIN_CONFIDENCE:
             return False
@@ -139,9 +232,10 @@ class Portfolio:
             entry_price  = entry_price,
             shares       = shares,
             bet_size     = bet_size,
-            entry_time   = datetime.utcnow().strftime("%H:%M:%S"),
+            entry_time   = int(now.timestamp()) if now else int(time.time()),
         )
-        self._signal_streak = {"label": None, "count": 0}
+        self._streak_label = None
+        self._streak_count = 0
         # Persistir trade abierto
         if self._db:
             self._db.save_trade(self.active_trade)
@@ -185,21 +279,17 @@ class Portfolio:
         exit_price = 1.0 if won else 0.0
         pnl        = trade.close(won, exit_price)
         self.capital = round(self.capital + trade.bet_size + pnl, 4)  # return stake + profit
-        self.closed_trades.append(trade)
+        self._append_closed(trade)
         self.active_trade = None
-        self._signal_streak = {"label": None, "count": 0}
+        self._streak_label = None
+        self._streak_count = 0
 
         # Record cumulative P&L snapshot
         total_pnl = round(self.capital - self.initial_capital, 4)
         self.pnl_history.append(round(total_pnl, 4))
 
-        # Persistir trade cerrado + estado del portafolio
-        if self._db:
-            self._db.save_trade(trade)
-            self._db.save_portfolio_state(
-                self.capital, self.initial_capital,
-                self.pnl_history, self._trade_counter,
-            )
+        # Persistir trade cerrado + estado del portafolio (un solo commit)
+        self._persist_close(trade, self.pnl_history[-1])
 
         return trade
 
@@ -208,25 +298,52 @@ class Portfolio:
         if not self.active_trade:
             return
         self.active_trade.status = "CANCELLED"
-        self.closed_trades.append(self.active_trade)
+        self._append_closed(self.active_trade)
+        self._persist_close(self.active_trade)
+        self.active_trade = None
+
+    def _persist_close(self, trade: Trade, pnl: Optional[float] = None) -> None:
+        """Guarda el trade cerrado/cancelado junto con el estado del portafolio."""
         if self._db:
-            self._db.save_trade(self.active_trade)
-            self._db.save_portfolio_state(
-                self.capital, self.initial_capital,
-                self.pnl_history, self._trade_counter,
+            self._db.save_close(
+                trade, self.capital, self.initial_capital,
+                self._trade_counter, pnl,
             )
-        self.active_trade = None
 
     # ── Stats ──────────────────────────────────────────────────────────────────
 
+    def _closed_stats(self) -> dict:
+        """
+        Agregados de los trades cerrados a partir de los contadores incrementales.
+        Se cachean entre ticks y se invalidan en _record_closed / restore.
+        El trade_log sale de _recent_log, que ya guarda los dicts.
+        """
+        if self._stats_cache is not None:
+            return self._stats_cache
+
+        n_wins       = self._n_wins
+        n_closed     = n_wins + self._n_losses
+        realized_pnl = self._realized_pnl_sum
+        best         = self._best_pnl if self._best_pnl is not None else 0
+        worst        = self._worst_pnl if self._worst_pnl is not None else 0
+
+        self._stats_cache = {
+            "realized_pnl": realized_pnl,
+            "total_trades": self._n_total,
+            "wins":         n_wins,
+            "losses":       self._n_losses,
+            "cancelled":    self._n_cancelled,
+            "win_rate":     round(n_wins / n_closed * 100, 1) if n_closed else 0.0,
+            "best_trade":   round(best, 4),
+            "worst_trade":  round(worst, 4),
+            "avg_pnl":      round(realized_pnl / n_closed, 4) if n_closed else 0,
+        }
+        return self._stats_cache
+
     def stats(self, up_price: float = 0.5, down_price: float = 0.5) -> dict:
-        closed   = self.closed_trades
-        wins     = [t for t in closed if t.status == "WIN"]
-        losses   = [t for t in closed if t.status == "LOSS"]
-        n_closed = len(wins) + len(losses)
-        win_rate = round(len(wins) / n_closed * 100, 1) if n_closed else 0.0
+        agg = self._closed_stats()
 
-        realized_pnl   = sum(t.pnl for t in closed if t.pnl is not None)
+        realized_pnl   = agg["realized_pnl"]
         unrealized_pnl = self.get_unrealized(up_price, down_price)
         total_pnl      = round(realized_pnl + unrealized_pnl, 4)
         equity         = round(self.capital + (self.active_trade.bet_size if self.active_trade else 0) + unrealized_pnl, 4)
@@ -239,7 +356,7 @@ class Portfolio:
                 **t.to_dict(),
                 "current_price":  round(cp, 4),
                 "mark_to_market": t.mark_to_market(cp),
-                "unrealized_pnl": t.unrealized_pnl(cp),
+                "unrealized_pnl": unrealized_pnl,
             }
 
         return {
@@ -247,19 +364,20 @@ class Portfolio:
             "capital":         round(self.capital, 4),
             "equity":          equity,
             "realized_pnl":    round(realized_pnl, 4),
-            "unrealized_pnl":  round(unrealized_pnl, 4),
+            "unrealized_pnl":  unrealized_pnl,
             "total_pnl":       total_pnl,
             "total_pnl_pct":   round(total_pnl / self.initial_capital * 100, 2),
-            "total_trades":    len(closed),
-            "wins":            len(wins),
-            "losses":          len(losses),
-            "cancelled":       len([t for t in closed if t.status == "CANCELLED"]),
-            "win_rate":        win_rate,
-            "best_trade":      round(max((t.pnl for t in closed if t.pnl), default=0), 4),
-            "worst_trade":     round(min((t.pnl for t in closed if t.pnl), default=0), 4),
-            "avg_pnl":         round(realized_pnl / n_closed, 4) if n_closed else 0,
-            "pnl_history":     self.pnl_history[-50:],
+            "total_trades":    agg["total_trades"],
+            "wins":            agg["wins"],
+            "losses":          agg["losses"],
+            "cancelled":       agg["cancelled"],
+            "win_rate":        agg["win_rate"],
+            "best_trade":      agg["best_trade"],
+            "worst_trade":     agg["worst_trade"],
+            "avg_pnl":         agg["avg_pnl"],
+            # Últimos 50 leídos desde la derecha del deque, sin recorrerlo entero
+            "pnl_history":     list(islice(reversed(self.pnl_history), 50))[::-1],
             "active_trade":    active,
-            "trade_log":       [t.to_dict() for t in reversed(closed[-20:])],
-            "signal_streak":   self._signal_streak,
+            "trade_log":       list(self._recent_log),
+            "signal_streak":   {"label": self._streak_label, "count": self._streak_count},
         }
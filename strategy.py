@@ -31,11 +31,28 @@ Uso:
 import time
 import sys
 import os
-import math
+import json
+import heapq
+import re
+import shutil
 import requests
-from datetime import datetime, timezone
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from datetime import datetime
+from typing import Optional
 from collections import deque
+from operator import itemgetter
+from concurrent.futures import ThreadPoolExecutor
 from py_clob_client.client import ClobClient
+from ob_kernel import side_totals
+
+# orjson es opcional: si esta instalado decodifica las respuestas de Gamma y
+# del CLOB directamente desde bytes; si no, se usa el json de la stdlib.
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
 
 # ─── Configuracion ────────────────────────────────────────────────────────────
 CLOB_HOST     = "https://clob.polymarket.com"
@@ -61,8 +78,41 @@ DIM    = "\033[2m"
 RESET  = "\033[0m"
 
 
+# Sesion HTTP compartida: reutiliza conexiones TCP/TLS (keep-alive)
+# entre llamadas a Gamma y al CLOB en vez de abrir una por request.
+_SESSION = requests.Session()
+_SESSION.headers.update({
+    "User-Agent": "polymarket-sol-strategy/2.0",
+    "Accept":     "application/json",
+})
+_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=8,
+    max_retries=Retry(
+        total=2,
+        backoff_factor=0.3,
+        status_forcelist=(429, 500, 502, 503, 504),
+    ),
+))
+
+
+# Fragmentos estaticos del dashboard, formateados una sola vez
+_BORDER     = f"{BOLD}{CYAN}{'═'*68}{RESET}"
+_HEADER     = f"{BOLD}{CYAN}  POLYMARKET - SOL Up/Down 5min | Estrategia OBI (Order Book Imbalance){RESET}"
+_SEP        = f"{DIM}{'─'*68}{RESET}"
+_SEP_INDENT = f"  {_SEP}"
+
+
+# En Windows, una llamada vacia a os.system habilita las secuencias ANSI (VT)
+# en la consola; los colores y clear() dependen de ellas.
+if os.name == "nt":
+    os.system("")
+
+_CLEAR = "\033[2J\033[H"   # borrar pantalla + cursor a (1,1)
+
+
 def clear():
-    os.system("cls" if os.name == "nt" else "clear")
+    sys.stdout.write(_CLEAR)
 
 
 # ─── Busqueda del mercado activo ──────────────────────────────────────────────
@@ -81,13 +131,13 @@ def get_current_slot_ts(lookahead=1):
 def fetch_market_by_slug(slug):
     """Busca un mercado en Gamma API por su slug."""
     try:
-        resp = requests.get(
+        resp = _SESSION.get(
             f"{GAMMA_API}/markets",
             params={"slug": slug},
             timeout=8,
         )
         resp.raise_for_status()
-        data = resp.json()
+        data = _json_loads(resp.content)
         if isinstance(data, list) and data:
             return data[0]
         return None
@@ -98,12 +148,12 @@ def fetch_market_by_slug(slug):
 def get_clob_market(condition_id):
     """Obtiene tokens y datos de trading desde el CLOB."""
     try:
-        resp = requests.get(
+        resp = _SESSION.get(
             f"{CLOB_HOST}/markets/{condition_id}",
             timeout=8,
         )
         resp.raise_for_status()
-        return resp.json()
+        return _json_loads(resp.content)
     except Exception:
         return None
 
@@ -112,42 +162,36 @@ def find_active_sol_market():
     """
     Busca el mercado de SOL Up/Down 5min activo y aceptando ordenes.
     Prueba el slot actual, anterior y siguiente para encontrar uno aceptable.
+    Las consultas a Gamma y al CLOB de cada tanda van en paralelo.
     """
     print(f"{CYAN}[*] Buscando mercado activo SOL Up/Down 5min...{RESET}")
 
     current_ts = get_current_slot_ts(0)
-    candidates = []
-
-    # Probar slots: -1 (anterior), 0 (actual), +1 (siguiente)
-    for offset in [-1, 0, 1, 2]:
-        ts   = current_ts + offset * SLOT_STEP
-        slug = f"sol-updown-5m-{ts}"
-        gm   = fetch_market_by_slug(slug)
-        if gm:
-            candidates.append((ts, slug, gm))
 
-    if not candidates:
-        return None
-
-    # Preferir el mercado aceptando ordenes mas cercano al momento actual
-    for ts, slug, gm in candidates:
-        cid = gm.get("conditionId")
-        if not cid:
-            continue
-        cm = get_clob_market(cid)
-        if cm and cm.get("accepting_orders"):
-            return _build_market_info(gm, cm)
-
-    # Si ninguno acepta ordenes, tomar cualquier activo
-    for ts, slug, gm in candidates:
-        cid = gm.get("conditionId")
-        if not cid:
+    # Probar slots: -1 (anterior), 0 (actual), +1, +2 (siguientes)
+    slugs = [f"sol-updown-5m-{current_ts + offset * SLOT_STEP}" for offset in (-1, 0, 1, 2)]
+
+    with ThreadPoolExecutor(max_workers=len(slugs)) as ex:
+        # ex.map conserva el orden de los slots
+        candidates = [gm for gm in ex.map(fetch_market_by_slug, slugs)
+                      if gm and gm.get("conditionId")]
+        if not candidates:
+            return None
+        clob_markets = list(ex.map(get_clob_market,
+                                   [gm["conditionId"] for gm in candidates]))
+
+    # Una sola pasada: preferir el mercado aceptando ordenes mas cercano
+    # al momento actual; si ninguno acepta, quedarse con el primer activo.
+    fallback = None
+    for gm, cm in zip(candidates, clob_markets):
+        if not cm:
             continue
-        cm = get_clob_market(cid)
-        if cm:
+        if cm.get("accepting_orders"):
             return _build_market_info(gm, cm)
+        if fallback is None:
+            fallback = (gm, cm)
 
-    return None
+    return _build_market_info(*fallback) if fallback else None
 
 
 def _build_market_info(gamma_market, clob_market):
@@ -159,7 +203,7 @@ def _build_market_info(gamma_market, clob_market):
     up_token   = None
     down_token = None
     for t in tokens:
-        outcome = (t.get("outcome", "") or "").lower()
+        outcome = (t.get("outcome") or "").lower()
         if "up" in outcome:
             up_token = t
         elif "down" in outcome:
@@ -170,11 +214,17 @@ def _build_market_info(gamma_market, clob_market):
         down_token = tokens[1]
 
     end_date = gamma_market.get("endDate") or clob_market.get("end_date_iso", "")
+    # Parsear la fecha de cierre una sola vez (epoch UTC)
+    try:
+        end_ts = datetime.fromisoformat(end_date.replace("Z", "+00:00")).timestamp() if end_date else None
+    except ValueError:
+        end_ts = None
 
     return {
         "condition_id":       clob_market.get("condition_id"),
         "question":           clob_market.get("question", "Solana Up or Down - 5min"),
         "end_date":           end_date,
+        "end_ts":             end_ts,
         "market_slug":        clob_market.get("market_slug", ""),
         "accepting_orders":   clob_market.get("accepting_orders", False),
         "up_token_id":        up_token["token_id"],
@@ -186,23 +236,21 @@ def _build_market_info(gamma_market, clob_market):
     }
 
 
-def seconds_to_market_end(market_info):
-    """Calcula segundos restantes hasta el cierre del mercado."""
-    end_raw = market_info.get("end_date", "")
-    if not end_raw:
-        return None
-    try:
-        end_dt = datetime.fromisoformat(end_raw.replace("Z", "+00:00"))
-        now_dt = datetime.now(timezone.utc)
-        diff   = (end_dt - now_dt).total_seconds()
-        return max(0, diff)
-    except Exception:
+def seconds_to_market_end(market_info, now=None):
+    """
+    Calcula segundos restantes hasta el cierre del mercado.
+    `now` (time.time()) permite reutilizar la lectura del reloj del frame.
+    """
+    end_ts = market_info.get("end_ts")
+    if end_ts is None:
         return None
+    return max(0.0, end_ts - (time.time() if now is None else now))
 
 
 # ─── Metricas del Order Book ──────────────────────────────────────────────────
 
-def get_order_book_metrics(client, token_id, top_n=TOP_LEVELS):
+def get_order_book_metrics(client: ClobClient, token_id: str,
+                           top_n: int = TOP_LEVELS) -> tuple[Optional[dict], Optional[str]]:
     """
     Descarga el order book del token y calcula:
       bid_volume, ask_volume, OBI, spread, VWAP mid, profundidad por nivel.
@@ -212,32 +260,48 @@ def get_order_book_metrics(client, token_id, top_n=TOP_LEVELS):
     except Exception as e:
         return None, str(e)
 
+    # El CLOB devuelve un hash del book: si no cambio desde el ultimo
+    # snapshot, las metricas tampoco, y se reutilizan sin recalcular.
+    ob_hash = getattr(ob, "hash", None)
+    cached  = getattr(client, "_last_ob", None)
+    if ob_hash and cached and cached[0] == (token_id, top_n, ob_hash):
+        return cached[1], None
+
     bids = ob.bids or []
     asks = ob.asks or []
 
     # Ordenar: bids de mayor a menor precio, asks de menor a mayor
-    top_bids = sorted(bids, key=lambda x: float(x.price), reverse=True)[:top_n]
-    top_asks = sorted(asks, key=lambda x: float(x.price))[:top_n]
-
-    bid_volume = sum(float(b.size) for b in top_bids)
-    ask_volume = sum(float(a.size) for a in top_asks)
+    # (heap parcial: O(N log top_n) en vez de ordenar todo el book).
+    # Cada precio se convierte a float una sola vez; el size solo en los
+    # niveles que quedan en el top.
+    top_bids = [(p, float(z)) for p, z in heapq.nlargest(
+        top_n, [(float(b.price), b.size) for b in bids], key=itemgetter(0))]
+    top_asks = [(p, float(z)) for p, z in heapq.nsmallest(
+        top_n, [(float(a.price), a.size) for a in asks], key=itemgetter(0))]
+
+    bid_volume, bid_notional = side_totals(top_bids)
+    ask_volume, ask_notional = side_totals(top_asks)
     total_vol  = bid_volume + ask_volume
 
     obi = (bid_volume - ask_volume) / total_vol if total_vol > 0 else 0.0
 
-    best_bid = float(top_bids[0].price) if top_bids else 0.0
-    best_ask = float(top_asks[0].price) if top_asks else 0.0
+    best_bid = top_bids[0][0] if top_bids else 0.0
+    best_ask = top_asks[0][0] if top_asks else 0.0
     spread   = round(best_ask - best_bid, 4) if (best_bid and best_ask) else 0.0
 
-    # VWAP mid (precio medio ponderado por volumen)
+    # VWAP mid (precio medio ponderado por volumen de ambos lados):
+    # (bvwap * bid_volume + avwap * ask_volume) / total = notional / total
     if total_vol > 0:
-        bvwap = (sum(float(b.price) * float(b.size) for b in top_bids) / bid_volume) if bid_volume > 0 else 0
-        avwap = (sum(float(a.price) * float(a.size) for a in top_asks) / ask_volume) if ask_volume > 0 else 0
-        vwap_mid = (bvwap * bid_volume + avwap * ask_volume) / total_vol
+        vwap_mid = (bid_notional + ask_notional) / total_vol
     else:
         vwap_mid = (best_bid + best_ask) / 2
 
-    return {
+    # Vista previa para el dashboard (con el maximo de cada lado, para
+    # escalar las barras sin volver a recorrerla al renderizar)
+    bids_preview = [(round(p, 4), round(z, 2)) for p, z in top_bids[:6]]
+    asks_preview = [(round(p, 4), round(z, 2)) for p, z in top_asks[:6]]
+
+    metrics = {
         "bid_volume":  bid_volume,
         "ask_volume":  ask_volume,
         "total_vol":   total_vol,
@@ -248,19 +312,56 @@ def get_order_book_metrics(client, token_id, top_n=TOP_LEVELS):
         "vwap_mid":    vwap_mid,
         "num_bids":    len(bids),
         "num_asks":    len(asks),
-        "top_bids":    [(round(float(b.price),4), round(float(b.size),2)) for b in top_bids[:6]],
-        "top_asks":    [(round(float(a.price),4), round(float(a.size),2)) for a in top_asks[:6]],
-    }, None
+        "top_bids":    bids_preview,
+        "top_asks":    asks_preview,
+        "max_bid_size": max((z for _, z in bids_preview), default=1.0),
+        "max_ask_size": max((z for _, z in asks_preview), default=1.0),
+    }
+    if ob_hash:
+        client._last_ob = ((token_id, top_n, ob_hash), metrics)
+    return metrics, None
 
 
 # ─── Señal y dashboard ────────────────────────────────────────────────────────
 
-def compute_signal(obi_now, obi_window, threshold):
+class RunningWindow:
+    """
+    Ventana deslizante de OBI que mantiene la suma acumulada, asi la
+    media es O(1) en vez de recorrer la ventana en cada frame.
+    """
+
+    __slots__ = ("dq", "sum")
+
+    def __init__(self, maxlen):
+        self.dq  = deque(maxlen=maxlen)
+        self.sum = 0.0
+
+    def append(self, x):
+        evicted = self.dq[0] if len(self.dq) == self.dq.maxlen else 0.0
+        self.dq.append(x)
+        self.sum += x - evicted
+
+    def clear(self):
+        self.dq.clear()
+        self.sum = 0.0
+
+    def __len__(self):
+        return len(self.dq)
+
+    def __iter__(self):
+        return iter(self.dq)
+
+    @property
+    def mean(self):
+        return self.sum / len(self.dq) if self.dq else 0.0
+
+
+def compute_signal(obi_now: float, avg_obi: float,
+                   threshold: float) -> tuple[str, str, int, float]:
     """
     Señal basada en OBI actual (60%) + promedio ventana (40%).
     Retorna (label, color, confidence_pct, combined_obi)
     """
-    avg_obi  = sum(obi_window) / len(obi_window) if obi_window else obi_now
     combined = 0.6 * obi_now + 0.4 * avg_obi
 
     abs_c = abs(combined)
@@ -276,25 +377,69 @@ def compute_signal(obi_now, obi_window, threshold):
         return "NEUTRAL  ──", YELLOW, 50, combined
 
 
-def obi_bar(obi, width=36):
+# Plantillas para las barras: se recortan por slice en vez de
+# construir "█" * n + " " * m en cada llamada.
+_BLOCKS = "█" * 64
+_SPACES = " " * 64
+
+# Glifos del historial OBI ya coloreados (DOWN, NEUTRAL, UP) y relleno
+_HIST_GLYPHS = (f"{RED}▼{RESET}", f"{YELLOW}─{RESET}", f"{GREEN}▲{RESET}")
+_HIST_DOTS   = "·" * WINDOW_SIZE
+
+
+def obi_bar(obi: float, width: int = 36) -> str:
     """Barra visual del OBI: verde = bids dominan, rojo = asks dominan."""
     half   = width // 2
     filled = min(int(abs(obi) * half), half)
     center = "│"
     if obi >= 0:
-        left  = " " * half
-        right = GREEN + "█" * filled + RESET + " " * (half - filled)
+        left  = _SPACES[:half]
+        right = f"{GREEN}{_BLOCKS[:filled]}{RESET}{_SPACES[:half - filled]}"
     else:
-        left  = " " * (half - filled) + RED + "█" * filled + RESET
-        right = " " * half
+        left  = f"{_SPACES[:half - filled]}{RED}{_BLOCKS[:filled]}{RESET}"
+        right = _SPACES[:half]
     return f"[{left}{center}{right}]"
 
 
-def size_bar(size, max_size, width=18):
+def size_bar(size: float, max_size: float, width: int = 18) -> str:
     if max_size == 0:
         return ""
     n = int((size / max_size) * width)
-    return "█" * n
+    return _BLOCKS[:n]
+
+
+# Ultimo frame completo dibujado (sin las lineas de estado), o None si no
+# se puede actualizar en sitio. La linea "Snapshot #..." va en la fila 5
+# (tras borde, titulo, borde y mercado) mientras ninguna linea se parta.
+_STATUS_ROW = 5
+_ANSI_RE    = re.compile(r"\033\[[0-9;]*m")
+_last_frame = None
+
+
+def _screen_rows(lines):
+    """
+    Filas que ocupa el frame si cabe en la terminal sin scroll ni lineas
+    partidas (sus filas en pantalla coinciden con las del frame); si no, None.
+    """
+    cols, rows = shutil.get_terminal_size()
+    physical = "\n".join(lines).split("\n")
+    if len(physical) >= rows:
+        return None
+    if any(len(_ANSI_RE.sub("", line)) >= cols for line in physical):
+        return None
+    return len(physical)
+
+
+def _forget_frame():
+    """Invalida el frame en pantalla (se imprimio algo debajo de el)."""
+    global _last_frame
+    _last_frame = None
+
+
+def _write_frame(lines):
+    """Escribe el frame completo con un solo write() a stdout."""
+    sys.stdout.write("\n".join(lines) + "\n")
+    sys.stdout.flush()
 
 
 def fmt_time(seconds):
@@ -305,96 +450,119 @@ def fmt_time(seconds):
     return f"{m}m {s:02d}s"
 
 
-def render_dashboard(market_info, up_m, obi_history, snap, threshold):
-    """Renderiza el dashboard completo."""
-    clear()
-    now_str   = datetime.now().strftime("%H:%M:%S")
-    remaining = seconds_to_market_end(market_info)
-    q         = market_info["question"]
+def _refresh_status(status, frame_rows):
+    """
+    Reescribe solo las lineas de snapshot/countdown del frame ya dibujado
+    (posicionando el cursor) y deja el cursor debajo del frame.
+    """
+    buf = [f"\033[{_STATUS_ROW + i};1H\033[2K{line}" for i, line in enumerate(status)]
+    buf.append(f"\033[{frame_rows + 1};1H")
+    sys.stdout.write("".join(buf))
+    sys.stdout.flush()
+
+
+def render_dashboard(market_info, up_m, obi_history, snap, threshold, now=None):
+    """
+    Renderiza el dashboard (el frame se escribe de una vez). Si todo lo
+    demas del frame es identico al ultimo dibujado, solo se actualizan la
+    hora y el countdown en vez de borrar y redibujar toda la pantalla.
+    """
+    global _last_frame
+    if now is None:
+        now = time.time()
+    now_str   = time.strftime("%H:%M:%S", time.localtime(now))
+    remaining = seconds_to_market_end(market_info, now)
     acc       = market_info["accepting_orders"]
 
-    print(f"{BOLD}{CYAN}{'═'*68}{RESET}")
-    print(f"{BOLD}{CYAN}  POLYMARKET - SOL Up/Down 5min | Estrategia OBI (Order Book Imbalance){RESET}")
-    print(f"{BOLD}{CYAN}{'═'*68}{RESET}")
-    print(f"  {BOLD}Mercado:{RESET} {WHITE}{q}{RESET}")
-    print(f"  Snapshot #{snap}  |  {WHITE}{now_str}{RESET}  |  "
-          f"Acepta ordenes: {''+GREEN+'SI'+RESET if acc else RED+'NO'+RESET}")
+    status = [f"  Snapshot #{snap}  |  {WHITE}{now_str}{RESET}  |  "
+              f"Acepta ordenes: {''+GREEN+'SI'+RESET if acc else RED+'NO'+RESET}"]
     if remaining is not None:
         rem_color = GREEN if remaining > 120 else YELLOW if remaining > 30 else RED
-        print(f"  Cierra en: {rem_color}{BOLD}{fmt_time(remaining)}{RESET}  |  "
-              f"Umbral: {YELLOW}{threshold:.0%}{RESET}  |  "
-              f"Ventana: {WINDOW_SIZE} snapshots  |  Profundidad: TOP {TOP_LEVELS}")
+        status.append(f"  Cierra en: {rem_color}{BOLD}{fmt_time(remaining)}{RESET}  |  "
+                      f"Umbral: {YELLOW}{threshold:.0%}{RESET}  |  "
+                      f"Ventana: {WINDOW_SIZE} snapshots  |  Profundidad: TOP {TOP_LEVELS}")
+
+    out  = _frame_lines(market_info, up_m, obi_history, status, threshold)
+    # Clave = el texto renderizado completo salvo las lineas de estado
+    body = (len(status), *out[:_STATUS_ROW - 1], *out[_STATUS_ROW - 1 + len(status):])
+    rows = _screen_rows(out)
+    if rows and _last_frame and _last_frame[0] == body:
+        _refresh_status(status, rows)
+        return
+
+    clear()
+    _write_frame(out)
+    _last_frame = (body, rows) if rows else None
 
-    print(f"{DIM}{'─'*68}{RESET}")
+
+def _frame_lines(market_info, up_m, obi_history, status, threshold):
+    """Lineas del frame completo, con `status` tras la linea del mercado."""
+    q   = market_info["question"]
+    out = [_BORDER, _HEADER, _BORDER, f"  {BOLD}Mercado:{RESET} {WHITE}{q}{RESET}"]
+    out.extend(status)
+    out.append(_SEP)
 
     if not up_m:
-        print(f"\n  {YELLOW}[!] Sin datos del order book...{RESET}")
-        return
+        out.append(f"\n  {YELLOW}[!] Sin datos del order book...{RESET}")
+        return out
 
     obi      = up_m["obi"]
-    sig, sig_color, conf, combined = compute_signal(obi, list(obi_history), threshold)
-    avg_obi  = sum(obi_history) / len(obi_history) if obi_history else obi
+    avg_obi  = obi_history.mean if obi_history else obi
+    sig, sig_color, conf, combined = compute_signal(obi, avg_obi, threshold)
 
     # ── Precios actuales ──────────────────────────────────────────────────────
-    print(f"\n  {BOLD}Precios de mercado:{RESET}")
+    out.append(f"\n  {BOLD}Precios de mercado:{RESET}")
     up_p   = market_info["up_price"]
     down_p = market_info["down_price"]
-    print(f"  {GREEN}UP (Yes)  {up_p:.4f} USDC{RESET}   "
-          f"{RED}DOWN (No)  {down_p:.4f} USDC{RESET}   "
-          f"{DIM}VWAP: {up_m['vwap_mid']:.4f}{RESET}")
+    out.append(f"  {GREEN}UP (Yes)  {up_p:.4f} USDC{RESET}   "
+               f"{RED}DOWN (No)  {down_p:.4f} USDC{RESET}   "
+               f"{DIM}VWAP: {up_m['vwap_mid']:.4f}{RESET}")
 
     # ── Volumenes ─────────────────────────────────────────────────────────────
-    print(f"\n  {BOLD}Volumenes (Token UP - top {TOP_LEVELS} niveles):{RESET}")
+    out.append(f"\n  {BOLD}Volumenes (Token UP - top {TOP_LEVELS} niveles):{RESET}")
     bid_bar_w = int((up_m["bid_volume"] / max(up_m["total_vol"], 0.01)) * 30)
     ask_bar_w = 30 - bid_bar_w
-    print(f"  {GREEN}Bids (comprar UP):  {up_m['bid_volume']:>9.2f} USDC  "
-          f"{'█'*bid_bar_w}{RESET}  ({up_m['num_bids']} ordenes)")
-    print(f"  {RED}Asks (vender UP):   {up_m['ask_volume']:>9.2f} USDC  "
-          f"{'█'*ask_bar_w}{RESET}  ({up_m['num_asks']} ordenes)")
-    print(f"  {DIM}Total vol:          {up_m['total_vol']:>9.2f} USDC  |  "
-          f"Spread: {up_m['spread']:.4f}{RESET}")
+    out.append(f"  {GREEN}Bids (comprar UP):  {up_m['bid_volume']:>9.2f} USDC  "
+               f"{_BLOCKS[:bid_bar_w]}{RESET}  ({up_m['num_bids']} ordenes)")
+    out.append(f"  {RED}Asks (vender UP):   {up_m['ask_volume']:>9.2f} USDC  "
+               f"{_BLOCKS[:ask_bar_w]}{RESET}  ({up_m['num_asks']} ordenes)")
+    out.append(f"  {DIM}Total vol:          {up_m['total_vol']:>9.2f} USDC  |  "
+               f"Spread: {up_m['spread']:.4f}{RESET}")
 
     # ── OBI ───────────────────────────────────────────────────────────────────
-    print(f"\n  {BOLD}Order Book Imbalance (OBI):{RESET}")
-    print(f"  {RED}◄ SELL (asks){RESET}  {obi_bar(obi)}  {GREEN}BUY (bids) ►{RESET}")
-    print(f"  OBI actual  = {BOLD}{WHITE}{obi:+.4f}{RESET}  ({obi:+.1%})")
-    print(f"  OBI ventana = {WHITE}{avg_obi:+.4f}{RESET}  ({avg_obi:+.1%})")
-    print(f"  OBI combined= {WHITE}{combined:+.4f}{RESET}  (60% actual + 40% ventana)")
+    out.append(f"\n  {BOLD}Order Book Imbalance (OBI):{RESET}")
+    out.append(f"  {RED}◄ SELL (asks){RESET}  {obi_bar(obi)}  {GREEN}BUY (bids) ►{RESET}")
+    out.append(f"  OBI actual  = {BOLD}{WHITE}{obi:+.4f}{RESET}  ({obi:+.1%})")
+    out.append(f"  OBI ventana = {WHITE}{avg_obi:+.4f}{RESET}  ({avg_obi:+.1%})")
+    out.append(f"  OBI combined= {WHITE}{combined:+.4f}{RESET}  (60% actual + 40% ventana)")
 
     # ── SEÑAL ─────────────────────────────────────────────────────────────────
-    print(f"\n  {DIM}{'─'*68}{RESET}")
-    print(f"  {BOLD}SEÑAL:{RESET}  {sig_color}{BOLD}  {sig}  {RESET}   "
-          f"{BOLD}Confianza: {WHITE}{conf}%{RESET}")
+    out.append("\n" + _SEP_INDENT)
+    out.append(f"  {BOLD}SEÑAL:{RESET}  {sig_color}{BOLD}  {sig}  {RESET}   "
+               f"{BOLD}Confianza: {WHITE}{conf}%{RESET}")
     interpret = (
         "Presion compradora dominante → mercado espera que SOL SUBA" if combined > threshold else
         "Presion vendedora dominante → mercado espera que SOL BAJE" if combined < -threshold else
         "Presion equilibrada → señal no definitiva"
     )
-    print(f"  {DIM}{interpret}{RESET}")
-    print(f"  {DIM}{'─'*68}{RESET}")
+    out.append(f"  {DIM}{interpret}{RESET}")
+    out.append(_SEP_INDENT)
 
     # ── Historial OBI ─────────────────────────────────────────────────────────
-    print(f"\n  {BOLD}Historial OBI (ultimos {WINDOW_SIZE} snapshots):{RESET}")
-    hist = list(obi_history)
-    hist_line = "  "
-    for o in hist:
-        if o > threshold:
-            hist_line += f"{GREEN}▲{RESET}"
-        elif o < -threshold:
-            hist_line += f"{RED}▼{RESET}"
-        else:
-            hist_line += f"{YELLOW}─{RESET}"
-    # Padding
-    hist_line += f"{DIM}" + "·" * (WINDOW_SIZE - len(hist)) + f"{RESET}"
-    print(hist_line + f"  (▲=UP | ▼=DOWN | ─=NEUTRAL, umbral {threshold:.0%})")
+    out.append(f"\n  {BOLD}Historial OBI (ultimos {WINDOW_SIZE} snapshots):{RESET}")
+    # Indice por snapshot: 0 = DOWN, 1 = NEUTRAL, 2 = UP
+    glyphs = "".join([_HIST_GLYPHS[(o > threshold) - (o < -threshold) + 1]
+                      for o in obi_history])
+    out.append(f"  {glyphs}{DIM}{_HIST_DOTS[:WINDOW_SIZE - len(obi_history)]}{RESET}"
+               f"  (▲=UP | ▼=DOWN | ─=NEUTRAL, umbral {threshold:.0%})")
 
     # ── Top del order book ────────────────────────────────────────────────────
     if up_m["top_bids"] or up_m["top_asks"]:
-        max_b = max((s for _, s in up_m["top_bids"]), default=1)
-        max_a = max((s for _, s in up_m["top_asks"]), default=1)
+        max_b = up_m["max_bid_size"]
+        max_a = up_m["max_ask_size"]
 
-        print(f"\n  {'Top Bids (UP)':^35}  {'Top Asks (UP)':^35}")
-        print(f"  {DIM}{'Precio':>8}  {'Volumen':>8}  {'':18}  {'Precio':>8}  {'Volumen':>8}  {'':18}{RESET}")
+        out.append(f"\n  {'Top Bids (UP)':^35}  {'Top Asks (UP)':^35}")
+        out.append(f"  {DIM}{'Precio':>8}  {'Volumen':>8}  {'':18}  {'Precio':>8}  {'Volumen':>8}  {'':18}{RESET}")
         rows = max(len(up_m["top_bids"]), len(up_m["top_asks"]))
         for i in range(rows):
             b_str = a_str = ""
@@ -406,10 +574,11 @@ def render_dashboard(market_info, up_m, obi_history, snap, threshold):
             if i < len(up_m["top_asks"]):
                 p, s = up_m["top_asks"][i]
                 a_str = f"{RED}{p:>8.4f}  {s:>8.2f}  {size_bar(s,max_a):<18}{RESET}"
-            print(f"  {b_str}  {a_str}")
+            out.append(f"  {b_str}  {a_str}")
 
-    print(f"\n{DIM}  Ctrl+C para salir  |  Interval: {POLL_INTERVAL}s  |  OBI Strategy v2.0{RESET}")
-    print(f"{BOLD}{CYAN}{'═'*68}{RESET}")
+    out.append(f"\n{DIM}  Ctrl+C para salir  |  Interval: {POLL_INTERVAL}s  |  OBI Strategy v2.0{RESET}")
+    out.append(_BORDER)
+    return out
 
 
 # ─── Main loop ────────────────────────────────────────────────────────────────
@@ -417,7 +586,7 @@ def render_dashboard(market_info, up_m, obi_history, snap, threshold):
 def run_strategy(market_info, threshold):
     """Loop principal: polling del order book y calculo de señales."""
     client      = ClobClient(CLOB_HOST)
-    obi_history = deque(maxlen=WINDOW_SIZE)
+    obi_history = RunningWindow(WINDOW_SIZE)
     snap        = 0
 
     print(f"\n{GREEN}[+] Iniciando monitoreo...{RESET}")
@@ -438,15 +607,18 @@ def run_strategy(market_info, threshold):
                 market_info["up_price"]   = up_m["vwap_mid"]
                 market_info["down_price"] = round(1 - up_m["vwap_mid"], 4)
 
-            render_dashboard(market_info, up_m, obi_history, snap, threshold)
+            now = time.time()   # un solo reloj por frame
+            render_dashboard(market_info, up_m, obi_history, snap, threshold, now)
 
             if up_err:
                 print(f"\n  {YELLOW}[!] Error book: {up_err}{RESET}")
+                _forget_frame()
 
             # Si el mercado cerro, buscar el siguiente
-            remaining = seconds_to_market_end(market_info)
+            remaining = seconds_to_market_end(market_info, now)
             if remaining is not None and remaining < 5:
                 print(f"\n  {YELLOW}[*] Mercado cerrando. Buscando siguiente slot...{RESET}")
+                _forget_frame()
                 time.sleep(8)
                 new_market = find_active_sol_market()
                 if new_market:
@@ -461,7 +633,7 @@ def run_strategy(market_info, threshold):
     except KeyboardInterrupt:
         print(f"\n\n{YELLOW}[*] Estrategia detenida por el usuario.{RESET}")
         if obi_history:
-            avg = sum(obi_history) / len(obi_history)
+            avg = obi_history.mean
             print(f"    OBI promedio sesion: {avg:+.4f} ({avg:+.1%})")
         print(f"{CYAN}[*] Hasta la proxima.{RESET}\n")
 